@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -24,6 +25,10 @@ def main(check: bool, path: Tuple[Path]) -> None:
     if not pypaths:
         raise click.BadParameter("No paths found matching {paths!r}".format(paths=path))
 
+    # Single files skip --workers, so black doesn't pay for setting up a process pool.
+    if len(pypaths) > 1:
+        arguments.extend(["--workers", str(os.cpu_count() or 1)])
+
     result = subprocess.run(arguments + pypaths)
     sys.exit(result.returncode)
 
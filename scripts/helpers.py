@@ -1,35 +1,78 @@
 """
 Used by the scripts here to gather the right files.
 """
+import functools
+import os
 from pathlib import Path
 from typing import Iterable
+from typing import Iterator
 from typing import Optional
+from typing import Set
+
+EXCLUDED_DIRECTORIES = frozenset({".tox", "build", ".git", ".mypy_cache", "__pycache__"})
 
 
 def gitroot(rel: Optional[Path] = None) -> Path:
-    start = path = rel or Path(__file__).parent
-    while path.parts:
-        for entry in path.iterdir():
-            if entry.is_dir() and entry.name == ".git":
-                return path
+    return _gitroot((rel or Path(__file__).parent).resolve())
+
+
+@functools.lru_cache(maxsize=None)
+def _gitroot(start: Path) -> Path:
+    path = start
+    while True:
+        if (path / ".git").is_dir():
+            return path
+        if path == path.parent:
+            break
         path = path.parent
     raise FileNotFoundError(f"Can't find git root from {start}")
 
 
 def exclude_path(path: Path) -> bool:
     """Checks if this is a directory we should skip"""
-    if ".tox" in path.parts:
-        return True
-    if "build" in path.parts:
-        return True
-    if path.name == "setup.py":
-        return True
-    return False
+    return path.name == "setup.py" or not EXCLUDED_DIRECTORIES.isdisjoint(path.parts)
+
 
+def include_name(name: str, exclude_pytest: bool = False) -> bool:
+    """Checks if this file name is a python source file we should use"""
+    if not name.endswith(".py") or name == "setup.py":
+        return False
+    if exclude_pytest and (name == "conftest.py" or name.startswith("test_") or name.endswith("_test.py")):
+        return False
+    return True
 
-def expand_paths(paths: Iterable[Path]) -> Iterable[Path]:
+
+def scan_directory(root: str, exclude_pytest: bool = False) -> Iterator[Path]:
+    """Walk a directory, pruning excluded directories before descending into them"""
+    # An explicit stack, rather than recursion, so each file is yielded straight to the caller
+    # instead of through one generator per directory level.
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in EXCLUDED_DIRECTORIES:
+                        pending.append(entry.path)
+                elif include_name(entry.name, exclude_pytest):
+                    yield Path(entry.path)
+
+
+def expand_paths(paths: Iterable[Path], exclude_pytest: bool = False) -> Iterable[Path]:
+    # Overlapping roots (e.g. src and src/pkg) would otherwise yield files twice.
+    seen: Set[str] = set()
     for part in paths:
-        for pyfile in part.glob("**/*.py"):
-            if exclude_path(pyfile):
+        if exclude_path(part):
+            continue
+        if part.is_dir():
+            pyfiles: Iterable[Path] = scan_directory(os.fspath(part), exclude_pytest)
+        elif include_name(part.name, exclude_pytest):
+            pyfiles = [part]
+        else:
+            continue
+
+        for pyfile in pyfiles:
+            key = os.path.normpath(pyfile)
+            if key in seen:
                 continue
+            seen.add(key)
             yield pyfile
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+import concurrent.futures
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+import click
+from helpers import expand_paths
+from helpers import include_name
+from typecheck import __gitroot__
+from typecheck import cache_arguments
+from typecheck import config_arguments
+from typecheck import run_mypy
+
+
+def run(args: List[str]) -> int:
+    return subprocess.run(args).returncode
+
+
+@click.command()
+@click.argument("path", type=Path, nargs=-1)
+def main(path: Tuple[Path]) -> None:
+    """Check formatting, import order and types in one pass
+
+    Files are discovered once and shared between black, isort and mypy, which
+    run concurrently. Everything runs in check mode, since the formatters would
+    race if they were rewriting the same files.
+    """
+    pyfiles = list(expand_paths(path))
+    if not pyfiles:
+        raise click.BadParameter("No paths found matching {paths!r}".format(paths=path))
+
+    pypaths = [str(p) for p in pyfiles]
+    mypy_pyfiles = [p for p in pyfiles if include_name(p.name, exclude_pytest=True)]
+    mypy_args = config_arguments() + cache_arguments(True, __gitroot__ / ".mypy_cache")
+
+    # Threads are enough here, all of the work happens in subprocesses.
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [
+            executor.submit(run, ["black", "-l120", "--check"] + pypaths),
+            executor.submit(run, ["isort", "--settings-path", f"{__gitroot__!s}", "--check-only"] + pypaths),
+            executor.submit(run_mypy, mypy_args, mypy_pyfiles),
+        ]
+        returncodes = [future.result() for future in futures]
+
+    sys.exit(max(returncodes))
+
+
+if __name__ == "__main__":
+    main()
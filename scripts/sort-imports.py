@@ -1,11 +1,9 @@
 #!/usr/bin/env python
-import subprocess
-import sys
+import os
 from pathlib import Path
 from typing import Tuple
 
 import click
-from helpers import expand_paths
 from helpers import gitroot
 
 __gitroot__ = gitroot()
@@ -16,18 +14,17 @@ __gitroot__ = gitroot()
 @click.argument("paths", type=Path, nargs=-1)
 def main(check: bool, paths: Tuple[Path]) -> None:
 
-    pyfiles = expand_paths(paths)
-    args = ["reorder-python-imports", "--py3-plus"]
+    if not paths:
+        raise click.BadParameter("No paths found matching {paths!r}".format(paths=paths))
 
-    if check:
-        args.append("--diff-only")
+    # isort walks the paths itself, skipping what tox.ini's [isort] section excludes.
+    args = ["isort", "--settings-path", f"{__gitroot__!s}", "--jobs", str(os.cpu_count() or 1)]
 
-    pypaths = [str(p) for p in pyfiles]
-    if not pypaths:
-        raise click.BadParameter("No paths found matching {paths!r}".format(paths=paths))
+    if check:
+        args.extend(["--check-only", "--diff"])
 
-    pc = subprocess.run(args + pypaths)
-    sys.exit(pc.returncode)
+    # Nothing left to do afterwards, so hand the process over to isort.
+    os.execvp(args[0], args + [str(p) for p in paths])
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
 #!/usr/bin/env python
+import collections
+import itertools
+import os
+import shutil
 import subprocess
 import sys
-import tempfile
 from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Tuple
 
 import click
@@ -12,30 +18,99 @@ from helpers import gitroot
 __gitroot__ = gitroot()
 
 
+def config_arguments() -> List[str]:
+    """Arguments pointing mypy at the repository configuration, if there is one"""
+    mypy_config = __gitroot__ / "mypy.ini"
+    if mypy_config.exists():
+        return ["--config-file", f"{mypy_config!s}"]
+    return []
+
+
+def cache_arguments(cache: bool, cache_dir: Path) -> List[str]:
+    """Arguments to enable (or disable) the incremental cache in a directory"""
+    if not cache:
+        return ["--no-incremental"]
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # One SQLite database is much cheaper to open than a JSON file per module.
+    return ["--cache-dir", f"{cache_dir!s}", "--incremental", "--sqlite-cache"]
+
+
+def shard_name(pyfile: Path) -> str:
+    """The top-level package (relative to the git root) which contains this file"""
+    try:
+        return pyfile.resolve().relative_to(__gitroot__).parts[0]
+    except (ValueError, IndexError):
+        return ""
+
+
+def run_mypy(args: List[str], pyfiles: Iterable[Path], daemon: bool = False) -> int:
+    """Run mypy once over a group of files"""
+    import tempfile
+
+    with tempfile.NamedTemporaryFile("w", prefix="mypy_pyfiles", suffix=".txt", delete=False) as fs:
+        for pyfile in pyfiles:
+            fs.write(f"{pyfile!s}\n")
+
+    try:
+        args = args + [f"@{fs.name!s}"]
+
+        result = None
+        if daemon and shutil.which("dmypy"):
+            result = subprocess.run(["dmypy", "run", "--"] + args)
+
+        # dmypy exits with 2 when the daemon itself fails, so retry with plain mypy.
+        if result is None or result.returncode == 2:
+            result = subprocess.run(["mypy"] + args)
+    finally:
+        os.unlink(fs.name)
+
+    return result.returncode
+
+
 @click.command()
-@click.option("--exclude-pytest/--no-exclude-pytest", default=True, help="Exclude pytest files?")
+@click.option("--exclude-pytest/--no-exclude-pytest", default=False, help="Exclude pytest files?")
+@click.option("--cache/--no-cache", default=True, help="Use the incremental mypy cache.")
+@click.option(
+    "--daemon/--no-daemon",
+    default=False,
+    help="Run mypy through the dmypy daemon (only with -j 1). The server keeps running; stop it with `dmypy stop`.",
+)
+@click.option("-j", "--jobs", default=1, type=int, help="Check top-level packages in this many parallel mypy runs.")
 @click.argument("path", type=Path, nargs=-1)
-def main(exclude_pytest: bool, path: Tuple[Path]) -> None:
+def main(exclude_pytest: bool, cache: bool, daemon: bool, jobs: int, path: Tuple[Path]) -> None:
     """Run mypy on a list of files"""
-    pyfiles = expand_paths(path)
+    if daemon and jobs > 1:
+        # There is only one daemon, so it can't check shards in parallel.
+        raise click.UsageError("--daemon can't be combined with --jobs greater than 1")
 
-    if not path:
+    pyfiles = iter(expand_paths(path, exclude_pytest=exclude_pytest))
+
+    first = next(pyfiles, None)
+    if first is None:
         raise click.BadParameter("No paths found for PATH {!r}".format(path))
+    pyfiles = itertools.chain([first], pyfiles)
 
-    mypy_config = __gitroot__ / "mypy.ini"
-    args = ["mypy"]
-    if mypy_config.exists():
-        args.extend(("--config-file", f"{mypy_config!s}"))
+    args = config_arguments()
+    cache_dir = __gitroot__ / ".mypy_cache"
+
+    if jobs <= 1:
+        sys.exit(run_mypy(args + cache_arguments(cache, cache_dir), pyfiles, daemon=daemon))
+
+    import concurrent.futures
 
-    with tempfile.TemporaryDirectory() as tdir:
-        mypy_pyfiles = Path(tdir) / "mypy_pyfiles.txt"
-        with mypy_pyfiles.open("w") as fs:
-            fs.write("\n".join(str(f) for f in pyfiles))
+    # Each shard gets its own cache, so that parallel runs don't fight over it.
+    shards: Dict[str, List[Path]] = collections.defaultdict(list)
+    for pyfile in pyfiles:
+        shards[shard_name(pyfile)].append(pyfile)
 
-        args.append(f"@{mypy_pyfiles!s}")
-        result = subprocess.run(args)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_mypy, args + cache_arguments(cache, cache_dir / (name or "_root")), shard)
+            for name, shard in shards.items()
+        ]
+        returncodes = [future.result() for future in futures]
 
-    sys.exit(result.returncode)
+    sys.exit(max(returncodes, default=0))
 
 
 if __name__ == "__main__":
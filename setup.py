@@ -1,7 +1,6 @@
 # Always prefer setuptools over distutils
 from os import path
 
-from setuptools import find_packages
 from setuptools import setup
 
 here = path.abspath(path.dirname(__file__))
@@ -31,8 +30,9 @@ setup(
         "Topic :: Utilities",
     ],
     keywords="utilties ssh networking",
-    packages=find_packages(),
+    packages=["supertunnel", "supertunnel.ssh"],
     python_requires=">=3.6, <4",
     entry_points={"console_scripts": ["st = supertunnel.command:main"]},
     install_requires=["click", 'dataclasses;python_version<"3.7"'],
+    extras_require={"orjson": ["orjson"]},
 )
@@ -134,8 +134,8 @@ def forward(ctx, host_args):
 
     click.echo("Forwarding ports:")
     for i, port in enumerate(set(cfg.forward_local), start=1):
-        click.echo("{}) local:{} -> remote:{}".format(i, port.source, port.destination))
+        click.echo(f"{i}) local:{port.source} -> remote:{port.destination}")
     for i, port in enumerate(set(cfg.forward_remote), start=1):
-        click.echo("{}) remote:{} -> local:{}".format(i, port.destination, port.source))
+        click.echo(f"{i}) remote:{port.destination} -> local:{port.source}")
 
     ctx.invoke(run, host_args=host_args)
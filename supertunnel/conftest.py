@@ -33,6 +33,9 @@ class MockMessenger:
         self._message = msg
         self._messages.append((self._status, self._message))
 
+    def idle(self):
+        self.message("")
+
 
 @pytest.fixture
 def stream():
@@ -1,16 +1,21 @@
+import contextlib
 import functools
 import json
 import logging
+import os
+import re
 import shlex
 import subprocess
-from pathlib import PosixPath
+import tempfile
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
+from typing import List
 from typing import NamedTuple
 from typing import Optional
-from typing import Set
+from typing import Tuple
 
 import click
 
@@ -19,27 +24,86 @@ from .messaging import echo_subprocess_error
 from .port import ForwardingPort
 from .ssh import SSHConfiguration
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    json_loads: Callable[[bytes], Any] = json.loads
+else:
+    json_loads = orjson.loads
+
 log = logging.getLogger(__name__)
+auto_log = log.getChild("auto")
+
+
+def iter_remote_lines(args: List[str]) -> Iterator[bytes]:
+    """
+    Run an ssh command, yielding lines from stdout as they arrive.
+
+    Raises :class:`subprocess.CalledProcessError` once the output is exhausted
+    if the command failed.
+    """
+    stdout = []
+    # stderr goes to a file rather than a pipe: nothing reads it until stdout is done,
+    # and a full stderr pipe would block the remote command before it got there.
+    with tempfile.TemporaryFile() as errfile:
+        with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=errfile) as proc:
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                stdout.append(line)
+                yield line
+            returncode = proc.wait()
+        errfile.seek(0)
+        stderr = errfile.read()
+
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, args, output=b"".join(stdout), stderr=stderr)
+    if stderr:
+        # e.g. the errors behind a guarded jupyter list command which failed.
+        auto_log.debug("Remote stderr = %s", stderr.decode("utf-8", "backslashreplace"))
+
+
+def iter_json_data(lines: Iterable[bytes]) -> Iterator["JupyterInfo"]:
+    """Iterate through decoded JSON information ports
+
+    The output is newline-delimited JSON, which is parsed straight from the
+    raw bytes, one line at a time.
+    """
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            continue
+
+        auto_log.debug("JSON payload = %r", line)
+        try:
+            data = json_loads(line)
+            info = JupyterInfo(
+                port=data["port"],
+                token=data["token"],
+                notebook_dir=data["notebook_dir"],
+                full_url=f"http://localhost:{data['port']:d}/?token={data['token']:s}",
+            )
+        except (KeyError, ValueError):
+            # Covers malformed JSON, lines which aren't valid UTF-8, and missing fields.
+            auto_log.exception("Couldn't parse %r", line.decode("utf-8", "backslashreplace"))
+        else:
+            auto_log.debug("parsed port = %s", info.port)
+            auto_log.debug("jupyter url = %r", info.full_url)
+            yield info
+
+
+JUPYTER_PROCESS_PATTERN = "python3?.* .*jupyter"
+
+
+@functools.lru_cache(maxsize=None)
+def pgrep_command(pattern: str, restrict_to_user: bool = True) -> str:
+    """The remote shell command which lists full command lines for processes matching pattern"""
+    pgrep_args = ["pgrep", "-f", shlex.quote(pattern), "|", "xargs", "ps", "-o", "command=", "-p"]
+    if restrict_to_user:
+        pgrep_args.insert(1, "-u$(id -u)")
+    return " ".join(pgrep_args)
 
 
-def iter_json_data(output):
-    """Iterate through decoded JSON information ports"""
-    log = logging.getLogger(__name__).getChild("auto")
-    for line in output.splitlines():
-        if line.strip("\r\n").strip():
-            log.debug("JSON payload = {0!r}".format(line))
-            try:
-                data = json.loads(line)
-                data["full_url"] = "http://localhost:{port:d}/?token={token:s}".format(**data)
-            except json.JSONDecodeError:
-                log.exception("Couldn't parse {0!r}".format(line))
-            else:
-                log.debug("parsed port = {0}".format(data["port"]))
-                log.debug("jupyter url = {!r}".format(data["full_url"]))
-                yield JupyterInfo(data)
-
-
-def iter_processes(cfg: SSHConfiguration, pattern: str, restrict_to_user: bool = True) -> Iterable[str]:
+def iter_processes(cfg: SSHConfiguration, pattern: str, restrict_to_user: bool = True) -> Iterator[str]:
     """
     Iterate over processes on the remote host which match the query string.
 
@@ -51,7 +115,6 @@ def iter_processes(cfg: SSHConfiguration, pattern: str, restrict_to_user: bool =
         The grep pattern to use to find processes on the remote host using `pgrep`
 
     """
-    log = logging.getLogger(__name__).getChild("auto")
     cfg = cfg.copy()
 
     # Ensure that we are correctly configured for a single command.
@@ -61,37 +124,20 @@ def iter_processes(cfg: SSHConfiguration, pattern: str, restrict_to_user: bool =
     cfg.forward_local = []
     cfg.forward_remote = []
 
-    cfg.args = []
+    cfg.args = [pgrep_command(pattern, restrict_to_user)]
 
-    pgrep_args = ["pgrep", "-f", shlex.quote(pattern), "|", "xargs", "ps", "-o", "command=", "-p"]
-    if restrict_to_user:
-        pgrep_args.insert(1, "-u$(id -u)")
-
-    cfg.args = [" ".join(pgrep_args)]
-
-    log.debug("ssh pgrep args = {!r}".format(cfg.arguments()))
-
-    cmd = subprocess.run(cfg.arguments(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    cmd.check_returncode()
+    ssh_pgrep_args = cfg.arguments()
+    auto_log.debug("ssh pgrep args = %r", ssh_pgrep_args)
 
-    procs = cmd.stdout.decode("utf-8", "backslashreplace")
-    return procs.splitlines()
+    for line in iter_remote_lines(ssh_pgrep_args):
+        yield line.decode("utf-8", "backslashreplace").rstrip("\r\n")
 
 
 class JupyterInfo(NamedTuple):
-    data: Dict[str, Any]
-
-    @property
-    def port(self):
-        return self.data["port"]
-
-    @property
-    def full_url(self):
-        return self.data["full_url"]
-
-    @property
-    def notebook_dir(self):
-        return self.data["notebook_dir"]
+    port: int
+    token: str
+    notebook_dir: str
+    full_url: str
 
 
 class JupyterCommand(NamedTuple):
@@ -102,11 +148,36 @@ class JupyterCommand(NamedTuple):
         return " ".join(shlex.quote(cpart) for cpart in (*self, "list", "--json"))
 
 
-def iter_jupyter_ports(cfg: SSHConfiguration, cmd: JupyterCommand) -> Iterator[JupyterInfo]:
+#: Printed by the remote shell in place of output from a jupyter list command which failed.
+JUPYTER_LIST_FAILED = "supertunnel-jupyter-list-failed"
+
+
+def guarded_list_command(cmd: JupyterCommand) -> str:
+    """The remote shell command for one jupyter list, which reports a failure instead of exiting with it"""
+    argument = cmd.argument()
+    return f"{argument} || echo {JUPYTER_LIST_FAILED} $? {shlex.quote(argument)}"
+
+
+def iter_list_output(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Log and drop the failure reports from :func:`guarded_list_command`, passing along other lines"""
+    marker = JUPYTER_LIST_FAILED.encode("ascii")
+    for line in lines:
+        if line.startswith(marker):
+            _, returncode, command = line.decode("utf-8", "backslashreplace").rstrip().split(" ", 2)
+            auto_log.warning("Listing jupyter servers failed (exit status %s): %s", returncode, command)
+            continue
+        yield line
+
+
+def iter_jupyter_ports(cfg: SSHConfiguration, cmds: Iterable[JupyterCommand]) -> Iterator[JupyterInfo]:
     """
     Find Jupyter ports
+
+    All of the commands are run in a single ssh session, so that we only pay
+    for one connection no matter how many jupyter installations we found.
+    Each command's failure is logged on its own, so one broken installation
+    doesn't hide the servers found by the others.
     """
-    log = logging.getLogger(__name__).getChild("auto")
     cfg = cfg.copy()
 
     # Ensure that we are correctly configured for a single command.
@@ -116,42 +187,90 @@ def iter_jupyter_ports(cfg: SSHConfiguration, cmd: JupyterCommand) -> Iterator[J
     cfg.forward_local = []
     cfg.forward_remote = []
 
-    ssh_juptyer_args = cfg.arguments() + [cmd.argument()]
-    log.debug("ssh jupyter args = {!r}".format(ssh_juptyer_args))
+    ssh_juptyer_args = cfg.arguments() + ["; ".join(guarded_list_command(cmd) for cmd in cmds)]
+    auto_log.debug("ssh jupyter args = %r", ssh_juptyer_args)
+
+    yield from iter_json_data(iter_list_output(iter_remote_lines(ssh_juptyer_args)))
 
-    cmd = subprocess.run(ssh_juptyer_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    cmd.check_returncode()
 
-    output = cmd.stdout.decode("utf-8", "backslashreplace")
-    seen: Set[int] = set()
-    for data in iter_json_data(output):
-        if data.port not in seen:
-            seen.add(data.port)
-            yield data
+@functools.lru_cache(maxsize=256)
+def split_command(proc: str) -> Tuple[str, ...]:
+    """Split a process command line, remembering lines we've seen before"""
+    return tuple(shlex.split(proc))
+
+
+JUPYTER_COMMAND_RE = re.compile(r"jupyter-(?:notebook|lab)")
 
 
 def find_jupyter_command(proc: str) -> Optional[JupyterCommand]:
-    log = logging.getLogger(__name__).getChild("auto")
-    parts = shlex.split(proc)
+    # Our own pgrep pipeline shows up in the process list, and always starts with the bare command.
+    if proc.startswith(("pgrep ", "xargs ", "pgrep\t", "xargs\t")):
+        return None
 
-    if parts[0] in ("pgrep", "xargs"):
+    # Cheaply reject lines which can't possibly match before paying for shlex.
+    if not JUPYTER_COMMAND_RE.search(proc):
+        auto_log.debug("Can't find jupyter notebook in candidate = %s", proc)
         return None
 
+    parts = split_command(proc)
+
     python = parts[0]
-    log.debug("Python candidate = {!r}".format(parts))
+    auto_log.debug("Python candidate = %r", parts)
     for p in parts[1:]:
         if p.endswith("jupyter-notebook"):
             jupyter = p
             break
         if p.endswith("jupyter-lab"):
-            jupyter = str(PosixPath(p).parent / "jupyter-notebook")
+            jupyter = p[: p.rfind("/") + 1] + "jupyter-notebook"
             break
     else:
-        log.debug("Can't find jupyter notebook in candidate = {}".format(proc))
+        auto_log.debug("Can't find jupyter notebook in candidate = %s", proc)
         return None
     return JupyterCommand(python, jupyter)
 
 
+#: The smallest unix socket path limit (sun_path) on supported platforms, less the trailing NUL.
+_SUN_PATH_MAX = 103
+
+#: %C expands to a 40 character hash, and ssh binds to a temporary name with 17 more characters.
+_CONTROL_PATH_OVERHEAD = 40 + 17
+
+
+@contextlib.contextmanager
+def multiplexed(cfg: SSHConfiguration) -> Iterator[SSHConfiguration]:
+    """
+    Share a single ssh connection between several short-lived ssh commands.
+
+    The first command starts an OpenSSH ControlMaster, and later commands
+    re-use its connection rather than each doing their own handshake. The
+    master connection is closed when the context exits. If the socket path
+    would be too long for this platform, the commands just connect separately.
+    """
+    # $TMPDIR can be long (e.g. on macOS), so prefer a short base for the socket.
+    base = "/tmp" if os.path.isdir("/tmp") else None
+    with tempfile.TemporaryDirectory(prefix="st-", dir=base) as control_dir:
+        control_path = os.path.join(control_dir, "cm-%C")
+        if len(control_path) - len("%C") + _CONTROL_PATH_OVERHEAD > _SUN_PATH_MAX:
+            auto_log.debug("Not multiplexing, control path %r would be too long", control_path)
+            yield cfg
+            return
+
+        cfg = cfg.copy()
+        cfg.control_master = "auto"
+        cfg.control_path = control_path
+        cfg.control_persist = "30"
+
+        try:
+            yield cfg
+        finally:
+            # Only bother asking the master to exit if one was started.
+            if os.listdir(control_dir):
+                exit_args = cfg.arguments(include_cmd_args=False)
+                exit_args[1:1] = ["-O", "exit"]
+                auto_log.debug("ssh exit args = %r", exit_args)
+                subprocess.run(exit_args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
 def get_relevant_ports(cfg, restrict_to_user=True, show_urls=True):
     """
     Get relevant port numbers for jupyter notebook services
@@ -160,32 +279,39 @@ def get_relevant_ports(cfg, restrict_to_user=True, show_urls=True):
     on the remote host. Its not easy, and kind of a big pile of shell hacks,
     but it mostly works for now.
     """
-    log = logging.getLogger(__name__).getChild("auto")
-
     if show_urls:
         click.echo("Locating {} notebooks...".format(click.style("jupyter", fg="green")))
 
     cfg = cfg.copy()
     cfg.batch_mode = True
 
-    pattern = "python3?.* .*jupyter"
+    with multiplexed(cfg) as cfg:
 
-    ports = set()
-    for proc in iter_processes(cfg, pattern, restrict_to_user=restrict_to_user):
-        cmd = find_jupyter_command(proc)
-        if cmd is None:
-            continue
+        # Several processes (e.g. multiple kernels) often share a single jupyter installation,
+        # which only needs to be asked once.
+        cmds: Dict[JupyterCommand, None] = {}
+        for proc in iter_processes(cfg, JUPYTER_PROCESS_PATTERN, restrict_to_user=restrict_to_user):
+            cmd = find_jupyter_command(proc)
+            if cmd is not None:
+                cmds[cmd] = None
+
+        if not cmds:
+            auto_log.info("No jupyter processes found")
+            return []
 
-        # TODO: Make JupyterInfo hashable, then simplify this so that
-        # list printing can happen at the end once we've gathered all possible ports,
-        # simplifying this list.
-        for data in iter_jupyter_ports(cfg, cmd):
-            ports.add(ForwardingPort(data.port, data.port))
-            if show_urls:
-                click.echo("{:d}) {data.full_url:s} ({data.notebook_dir:s})".format(len(ports), data=data))
+        # The same server can be listed by more than one jupyter installation,
+        # so keep the first entry for each port.
+        notebooks: Dict[int, JupyterInfo] = {}
+        for data in iter_jupyter_ports(cfg, cmds):
+            notebooks.setdefault(data.port, data)
+
+    if show_urls:
+        for i, data in enumerate(notebooks.values(), start=1):
+            click.echo("{:d}) {data.full_url:s} ({data.notebook_dir:s})".format(i, data=data))
 
-    log.info("Auto-discovered ports = {0!r}".format(ports))
-    return list(ports)
+    ports = [ForwardingPort(port, port) for port in notebooks]
+    auto_log.info("Auto-discovered ports = %r", ports)
+    return ports
 
 
 opt_restrict_user = functools.partial(
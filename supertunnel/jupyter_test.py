@@ -1,5 +1,7 @@
+import io
 import json
 import logging
+import shlex
 import subprocess
 from typing import Any
 from typing import List
@@ -8,9 +10,13 @@ import sys
 import click
 import pytest
 
+from . import jupyter as jupyter_module
 from .command import main
 from .jupyter import get_relevant_ports
+from .jupyter import iter_json_data
+from .jupyter import iter_remote_lines
 from .jupyter import jupyter
+from .jupyter import multiplexed
 from .port import ForwardingPort
 from .ssh import SSHConfiguration
 
@@ -35,6 +41,8 @@ def mock_run_ssh(args: List[str], **config: Any) -> subprocess.CompletedProcess:
             stdout.append("/other/python /path/to/jupyter-lab")
         if "bad-jupyter" in hostname:
             stdout.append("/bad/python /path/to/jupyter-notebook")
+        if "broken-jupyter" in hostname:
+            stdout.append("/broken/python /path/to/jupyter-notebook")
         if "not-jupyter" in hostname:
             stdout.append("/not/jupyter/python /path/to/jupyter/decoy")
             stdout.append(
@@ -43,22 +51,29 @@ def mock_run_ssh(args: List[str], **config: Any) -> subprocess.CompletedProcess:
             )
         if "no-python" not in hostname:
             stdout.append("/some/python /path/to/jupyter-lab")
+        if "multi-kernel" in hostname:
+            stdout.append("/some/python /path/to/jupyter-notebook --port=8889")
 
         if "pgrep-self" in hostname:
             stdout.insert(1, args[-1])
 
-    if args[-1].startswith("/some/python"):
-        stdout.extend(
-            [
-                json.dumps(dict(port=47, token="foobarbaz", notebook_dir="/notebooks/")),
-                json.dumps(dict(port=20, token="bazbarfoo", notebook_dir="/notebooks/")),
-            ]
-        )
+    # Jupyter list commands are batched into a single remote shell command.
+    for command in args[-1].split("; "):
+        if command.startswith("/some/python"):
+            stdout.extend(
+                [
+                    json.dumps(dict(port=47, token="foobarbaz", notebook_dir="/notebooks/")),
+                    json.dumps(dict(port=20, token="bazbarfoo", notebook_dir="/notebooks/")),
+                ]
+            )
 
-    if args[-1].startswith("/other/python"):
-        stdout.append(json.dumps(dict(port=42, token="foobarbaz", notebook_dir="/notebooks/")))
-    if args[-1].startswith("/bad/python"):
-        stdout.append("not-really-json{)")
+        if command.startswith("/other/python"):
+            stdout.append(json.dumps(dict(port=42, token="foobarbaz", notebook_dir="/notebooks/")))
+        if command.startswith("/bad/python"):
+            stdout.append("not-really-json{)")
+        if command.startswith("/broken/python"):
+            # The command fails, so the shell runs the echo after ||
+            stdout.append(" ".join(shlex.split(command.split(" || echo ", 1)[1].replace("$?", "1"))))
 
     if "no-stdout" in args[-2].split("."):
         stdout = [""]
@@ -80,15 +95,86 @@ def config():
     return cfg
 
 
+class MockPopen:
+    """Streams the output of :func:`mock_run_ssh` like a real subprocess"""
+
+    def __init__(self, args: List[str], **config: Any) -> None:
+        self.args = args
+        self._result = mock_run_ssh(args, **config)
+        self.returncode = None
+        self.stdout = io.BytesIO(self._result.stdout)
+        self.stderr = io.BytesIO(self._result.stderr)
+
+    def wait(self):
+        self.returncode = self._result.returncode
+        return self.returncode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.wait()
+
+
 @pytest.fixture
 def ssh(monkeypatch):
+    calls = []
+
+    def mock_popen(args, **config):
+        calls.append(args)
+        return MockPopen(args, **config)
+
     monkeypatch.setattr(subprocess, "run", mock_run_ssh)
+    monkeypatch.setattr(subprocess, "Popen", mock_popen)
+    return calls
 
 
 def test_discovery(ssh, config):
     assert set(get_relevant_ports(config)) == {ForwardingPort(47, 47), ForwardingPort(20, 20)}
 
 
+def test_discovery_single_session(ssh, config):
+    config.set_host(["bad-jupyter.example.com"])
+
+    ports = get_relevant_ports(config, restrict_to_user=False)
+    assert set(ports) == {ForwardingPort(47, 47), ForwardingPort(20, 20), ForwardingPort(42, 42)}
+
+    # One ssh call for pgrep, and one for all of the jupyter list commands.
+    assert len(ssh) == 2
+
+    # Both calls share a single multiplexed connection.
+    for args in ssh:
+        assert "ControlMaster auto" in args
+    assert len({args[args.index("ControlMaster auto") + 2] for args in ssh}) == 1
+
+
+def test_multiplexed_exit(monkeypatch, config):
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda args, **kwargs: calls.append(args))
+
+    with multiplexed(config) as cfg:
+        assert "ControlMaster auto" in cfg.arguments()
+
+    # No master connection was started, so there is nothing to close.
+    assert calls == []
+
+    with multiplexed(config) as cfg:
+        control_path = cfg.control_path.replace("%C", "socket")
+        open(control_path, "w").close()
+
+    (args,) = calls
+    assert args[:3] == ["ssh", "-O", "exit"]
+    assert args[-1] == "example.com"
+
+
+def test_multiplexed_path_too_long(monkeypatch, config):
+    monkeypatch.setattr(jupyter_module, "_SUN_PATH_MAX", 10)
+
+    with multiplexed(config) as cfg:
+        assert "ControlMaster auto" not in cfg.arguments()
+        assert cfg.arguments() == config.arguments()
+
+
 def test_discovery_no_jupyter(ssh, config):
     config.set_host(["no-stdout.example.com"])
     assert get_relevant_ports(config) == []
@@ -103,6 +189,43 @@ def test_discovery_decode_error(ssh, config, caplog):
             assert record.message.startswith("Couldn't parse 'not-really-json{)'")
 
 
+def test_json_data_lines():
+    output = b"\r\n".join(
+        [
+            json.dumps(dict(port=47, token="foobarbaz", notebook_dir="/notebooks/")).encode("utf-8"),
+            b"   ",
+            b"\xff\xfe not utf-8",
+            json.dumps(dict(port=30, token="missing-notebook-dir")).encode("utf-8"),
+            json.dumps(dict(port=20, token="bazbarfoo", notebook_dir="/notebooks/")).encode("utf-8"),
+        ]
+    )
+    infos = list(iter_json_data(output.splitlines(keepends=True)))
+    assert [info.port for info in infos] == [47, 20]
+    assert infos[0].full_url == "http://localhost:47/?token=foobarbaz"
+
+
+def test_discovery_dedupe_commands(ssh, config):
+    config.set_host(["multi-kernel.example.com"])
+
+    assert set(get_relevant_ports(config)) == {ForwardingPort(47, 47), ForwardingPort(20, 20)}
+
+    # Both processes use the same jupyter installation, which is only listed once.
+    (command,) = ssh[-1][-1].split("; ")
+    assert command.startswith("/some/python /path/to/jupyter-notebook list --json || ")
+
+
+def test_discovery_broken_jupyter(ssh, config, caplog):
+    config.set_host(["broken-jupyter.example.com"])
+
+    # The broken installation is listed before the working one.
+    assert set(get_relevant_ports(config)) == {ForwardingPort(47, 47), ForwardingPort(20, 20)}
+
+    (record,) = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert record.message == (
+        "Listing jupyter servers failed (exit status 1): /broken/python /path/to/jupyter-notebook list --json"
+    )
+
+
 def test_discovery_pgrep_self(ssh, config):
     config.set_host(["pgrep-self.example.com"])
     assert set(get_relevant_ports(config)) == {ForwardingPort(47, 47), ForwardingPort(20, 20)}
@@ -154,3 +277,16 @@ def test_jupyter_no_ports(ssh, invoke):
     assert args[:3] == ["ssh", "-N", "-v"]
     assert "BatchMode yes" in args
     assert args[-1] == "example.com"
+
+
+def test_remote_lines_large_stderr():
+    # More stderr than a pipe buffer holds, written before any stdout.
+    script = "import sys; sys.stderr.write('x' * 200000); sys.stderr.flush(); print('done'); sys.exit(3)"
+    lines = []
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        for line in iter_remote_lines([sys.executable, "-c", script]):
+            lines.append(line)
+
+    assert lines == [b"done\n"]
+    assert excinfo.value.returncode == 3
+    assert len(excinfo.value.stderr) == 200000
@@ -1,16 +1,70 @@
 import logging.handlers
 import os
+import signal
+import sys
+from typing import Any
+
+#: Records from an ssh process carry its PID (see :class:`PIDFilter` for the others).
+LOG_FORMAT = "[%(levelname)-8s %(asctime)s] %(message)s [%(name)s:%(pid)s]"
 
 
 class PIDFilter(logging.Filter):
-    def __init__(self, pid):
+    """Fill in ``record.pid`` for records which weren't tagged with an ssh process"""
+
+    def __init__(self, pid="-"):
+        super().__init__()
         self.pid = pid
 
     def filter(self, record):
-        record.pid = self.pid
+        if getattr(record, "pid", None) is None:
+            record.pid = self.pid
         return True
 
 
+def buffered(handler: logging.Handler) -> logging.handlers.MemoryHandler:
+    """Batch records for a file handler, writing them out early only for errors
+
+    Buffering trades how soon records reach the file for fewer writes: a busy
+    ssh log would otherwise cost a write per line. To keep the files useful with
+    ``tail -f``, :func:`flush_buffered` is called whenever ssh goes quiet, and
+    :func:`exit_on_signal` makes sure the buffers are written when the terminal
+    goes away. logging.shutdown closes (and so flushes) the buffers at exit.
+    """
+    return logging.handlers.MemoryHandler(1024, flushLevel=logging.ERROR, target=handler)
+
+
+def flush_buffered() -> None:
+    """Write out any records held back by :func:`buffered` handlers"""
+    for name in (None, "ssh"):
+        for handler in logging.getLogger(name).handlers:
+            if isinstance(handler, logging.handlers.MemoryHandler):
+                handler.flush()
+
+
+def _exit(signum: int, frame: Any) -> None:
+    # Unwind normally, so that finally blocks run and logging.shutdown flushes at exit.
+    sys.exit(128 + signum)
+
+
+def exit_on_signal() -> None:
+    """Turn SIGTERM and SIGHUP into a normal exit, where they would otherwise kill us outright"""
+    for name in ("SIGTERM", "SIGHUP"):
+        signum = getattr(signal, name, None)
+        if signum is not None and signal.getsignal(signum) == signal.SIG_DFL:
+            signal.signal(signum, _exit)
+
+
+def rollover(handler: logging.Handler) -> None:
+    """Roll over a (possibly buffered) rotating file handler"""
+    if isinstance(handler, logging.handlers.MemoryHandler):
+        handler.flush()
+        if handler.target is None:
+            return
+        handler = handler.target
+    if isinstance(handler, logging.handlers.RotatingFileHandler):
+        handler.doRollover()
+
+
 def setup_logging(verbose):
     """Set up the loggers"""
     root = logging.getLogger()
@@ -21,17 +75,19 @@ def setup_logging(verbose):
 
     # Logger for the master process.
     h = logging.FileHandler(os.path.join(logdir, "st.log"), mode="w")
-    f = logging.Formatter("[%(levelname)-8s %(asctime)s] %(message)s [%(name)s]")
+    f = logging.Formatter(LOG_FORMAT)
 
     h.setFormatter(f)
+    h.addFilter(PIDFilter())
     h.setLevel(logging.DEBUG)
     root.setLevel(logging.DEBUG)
-    root.addHandler(h)
+    root.addHandler(buffered(h))
 
     lvl = {1: logging.INFO, 0: logging.WARNING}.get(verbose, logging.DEBUG)
     sh = logging.StreamHandler()
     sh.setLevel(lvl)
     sh.setFormatter(f)
+    sh.addFilter(PIDFilter())
     root.addHandler(sh)
 
     # Logger for each subprocess.
@@ -40,11 +96,14 @@ def setup_logging(verbose):
     # recent ones?
     ssh = logging.getLogger("ssh")
     ssh_handler = logging.handlers.RotatingFileHandler(
-        os.path.join(logdir, "ssh.log"), mode="w", backupCount=10, maxBytes=1e6
+        os.path.join(logdir, "ssh.log"), mode="w", backupCount=3, maxBytes=int(50e6), delay=True
     )
-    ssh_formatter = logging.Formatter("[%(levelname)-8s %(asctime)s] %(message)s [%(name)s]")
+    ssh_formatter = logging.Formatter(LOG_FORMAT)
     ssh_handler.setFormatter(ssh_formatter)
+    ssh_handler.addFilter(PIDFilter())
     ssh_handler.setLevel(logging.DEBUG)
-    ssh.addHandler(ssh_handler)
+    ssh.addHandler(buffered(ssh_handler))
     ssh.setLevel(logging.DEBUG)
     ssh.propagate = False
+
+    exit_on_signal()
@@ -0,0 +1,92 @@
+import logging.handlers
+import signal
+from typing import Any
+from typing import Dict
+
+import pytest
+
+from .log import buffered
+from .log import exit_on_signal
+from .log import flush_buffered
+from .log import LOG_FORMAT
+from .log import PIDFilter
+from .log import rollover
+
+
+def test_buffered_rollover(tmp_path: Any) -> None:
+    target = logging.handlers.RotatingFileHandler(str(tmp_path / "ssh.log"), mode="w", backupCount=2)
+    handler = buffered(target)
+
+    logger = logging.getLogger(__name__).getChild("rollover")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("first session")
+        assert (tmp_path / "ssh.log").read_text() == ""
+
+        rollover(handler)
+        assert (tmp_path / "ssh.log.1").read_text() == "first session\n"
+
+        logger.error("second session")
+        assert (tmp_path / "ssh.log").read_text() == "second session\n"
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        target.close()
+
+
+def test_pid_format(tmp_path: Any) -> None:
+    target = logging.FileHandler(str(tmp_path / "st.log"), mode="w")
+    target.setFormatter(logging.Formatter(LOG_FORMAT))
+    target.addFilter(PIDFilter())
+
+    logger = logging.getLogger(__name__).getChild("pid")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(target)
+    try:
+        logging.LoggerAdapter(logger, {"pid": 1234}).info("from ssh")
+        logging.LoggerAdapter(logger, {"pid": None}).info("before ssh")
+        logger.info("elsewhere")
+    finally:
+        logger.removeHandler(target)
+        target.close()
+
+    # Drop the level and timestamp.
+    lines = [line.split("] ", 1)[1] for line in (tmp_path / "st.log").read_text().splitlines()]
+    assert lines == [
+        f"from ssh [{logger.name}:1234]",
+        f"before ssh [{logger.name}:-]",
+        f"elsewhere [{logger.name}:-]",
+    ]
+
+
+def test_flush_buffered(tmp_path: Any) -> None:
+    target = logging.FileHandler(str(tmp_path / "ssh.log"), mode="w")
+    handler = buffered(target)
+
+    logger = logging.getLogger("ssh")
+    logger.addHandler(handler)
+    try:
+        logger.warning("still connecting")
+        assert (tmp_path / "ssh.log").read_text() == ""
+
+        flush_buffered()
+        assert (tmp_path / "ssh.log").read_text() == "still connecting\n"
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        target.close()
+
+
+def test_exit_on_signal(monkeypatch: Any) -> None:
+    installed: Dict[int, Any] = {}
+    monkeypatch.setattr(signal, "getsignal", lambda signum: signal.SIG_DFL)
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: installed.setdefault(signum, handler))
+
+    exit_on_signal()
+    assert signal.SIGTERM in installed
+
+    with pytest.raises(SystemExit) as excinfo:
+        installed[signal.SIGTERM](signal.SIGTERM, None)
+    assert excinfo.value.code == 128 + signal.SIGTERM
@@ -3,10 +3,12 @@ import datetime as dt
 import io
 import subprocess
 import sys
+import time
 from typing import Any
 from typing import Dict
 from typing import IO
 from typing import Optional
+from typing import Tuple
 from typing import Type
 
 import click
@@ -26,12 +28,14 @@ class _Terminfo:
     """
     Class for getting information about the current terminal.
 
-    Used as a global singleton in this module.
+    Used as a global singleton in this module, through :class:`_LazyTerminfo`.
 
     """
 
     __tty: bool
 
+    _CAPS = ("cr", "el", "rmam", "smam")
+
     def __init__(self) -> None:
         try:
             self.__tty = sys.stdout.isatty()
@@ -44,6 +48,10 @@ class _Terminfo:
             except curses.error:
                 self.__tty = False
         self.__ti: Dict[str, Optional[bytes]] = {}
+        self.__has: Dict[Tuple[str, ...], bool] = {}
+        # Look up the capabilities used by StatusMessage once, up front.
+        for cap in self._CAPS:
+            self.__ensure(cap)
 
     def __ensure(self, cap: str) -> Optional[bytes]:
         if cap not in self.__ti:
@@ -58,25 +66,42 @@ class _Terminfo:
         return self.__ti[cap]
 
     def has(self, *caps: str) -> bool:
-        return all(self.__ensure(cap) is not None for cap in caps)
+        if caps not in self.__has:
+            self.__has[caps] = all(self.__ensure(cap) is not None for cap in caps)
+        return self.__has[caps]
 
-    def send(self, *caps: str) -> None:
-        # Flush TextIOWrapper to the binary IO buffer
-        sys.stdout.flush()
+    def sequence(self, *caps: str) -> bytes:
+        """The bytes to send for these capabilities, in order"""
+        parts = []
         for cap in caps:
-            # We should use curses.putp here, but it's broken in
-            # Python3 because it writes directly to C's buffered
-            # stdout and there's no way to flush that.
             if isinstance(cap, tuple):
                 s = curses.tparm(self.__ensure(cap[0]), *cap[1:])
             else:
                 s = self.__ensure(cap)
             if s is None:
                 raise ValueError(f"Can't write {cap}")
-            sys.stdout.buffer.write(s)
+            parts.append(s)
+        return b"".join(parts)
+
+
+class _LazyTerminfo:
+    """
+    Stand-in for the terminfo singleton, which only sets up curses on first use.
+
+    Importing this module (e.g. for the CLI or the tests) shouldn't pay for
+    terminal initialization that may never be needed.
+    """
+
+    def __init__(self) -> None:
+        self.__terminfo: Optional[_Terminfo] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self.__terminfo is None:
+            self.__terminfo = _Terminfo()
+        return getattr(self.__terminfo, name)
 
 
-terminfo = _Terminfo()
+terminfo = _LazyTerminfo()
 
 
 class StatusMessage:
@@ -90,50 +115,87 @@ class StatusMessage:
         self._stream = stream
         if self._enabled is None:
             type(self)._enabled = terminfo.has("cr", "el", "rmam", "smam")
+        if self._enabled:
+            # Beginning of line, clear line, disable wrap ... enable wrap
+            self._prefix = terminfo.sequence("cr", "el", "rmam").decode("ascii")
+            self._suffix = terminfo.sequence("smam").decode("ascii")
+            self._clear = terminfo.sequence("el").decode("ascii")
 
         self._change = dt.datetime.now()
         self._status = status
         self._message = ""
         self._template = "[{status:s}] {td:s} | {msg:s}"
+        self._td_seconds = -1
+        self._td = ""
+
+        # Chatty message() callers are limited to one refresh per interval.
+        self._last_tick = 0.0
+        self._min_interval = 0.1
+        # Set when the throttle held back a refresh, so idle() knows to draw it.
+        self._pending = False
 
     def __enter__(self) -> "StatusMessage":
         self.last = ""
-        self._update()
+        self._update(force=True)
         return self
 
     def __exit__(self, typ: Type[BaseException], value: BaseException, traceback: Any) -> Optional[bool]:
         if self._enabled:
             # Beginning of line and clear
-            terminfo.send("el")
+            self._stream.write(self._clear)
             self._stream.flush()
         return None
 
     def status(self, msg: str, **kwargs: Any) -> None:
-        kwargs.setdefault("reset", True)
-        self._status = click.style(msg, **kwargs)
-        self._update()
+        status = self._style(msg, **kwargs)
+        if status == self._status:
+            # Repeated reports of the same state don't redraw or restart the clock.
+            return
+        self._status = status
+        self._update(force=True)
         self._change = dt.datetime.now()
 
     def message(self, msg: str, **kwargs: Any) -> None:
-        kwargs.setdefault("reset", True)
-        self._message = click.style(msg, **kwargs)
+        self._message = self._style(msg, **kwargs)
         self._update()
 
+    def idle(self) -> None:
+        """Called after a quiet spell: draw a message the throttle held back, or else clear it"""
+        if self._pending:
+            self._update(force=True)
+        else:
+            self.message("")
+
+    def _style(self, msg: str, **kwargs: Any) -> str:
+        # Nothing is drawn when disabled, so don't bother with escapes.
+        if not self._enabled:
+            return msg
+        kwargs.setdefault("reset", True)
+        return click.style(msg, **kwargs)
+
     def _build_message(self) -> str:
         td = dt.datetime.now() - self._change
-        return self._template.format(status=self._status, td=format_timedelta(td), msg=self._message)
+        # The elapsed time is only shown to the second, so reuse it between ticks.
+        if td.seconds != self._td_seconds:
+            self._td_seconds = td.seconds
+            self._td = format_timedelta(td)
+        return self._template.format(status=self._status, td=self._td, msg=self._message)
 
-    def _update(self) -> None:
+    def _update(self, force: bool = False) -> None:
         if not self._enabled:
             return
 
+        tick = time.monotonic()
+        if not force and tick - self._last_tick < self._min_interval:
+            self._pending = True
+            return
+        self._last_tick = tick
+        self._pending = False
+
         msg = self._build_message()
         if msg != self.last:
-            # Beginning of line, clear line, disable wrap
-            terminfo.send("cr", "el", "rmam")
-            self._stream.write(msg)
-            # Enable wrap
-            terminfo.send("smam")
+            # One write per refresh, so the line is never seen half-drawn.
+            self._stream.write(self._prefix + msg + self._suffix)
             self.last = msg
             self._stream.flush()
 
@@ -144,7 +206,9 @@ def echo_subprocess_error(error: subprocess.CalledProcessError, message: str, st
     """
     error_message = "[{}]".format(click.style("ERROR", fg="red"))
     click.echo("{} {}: {:s}".format(error_message, message, str(error)), err=stderr)
-    for line in error.stdout.decode("utf-8", "backslashreplace").splitlines():
-        click.echo("{} STDOUT: {}".format(error_message, line), err=stderr)
-    for line in error.stderr.decode("utf-8", "backslashreplace").splitlines():
-        click.echo("{} STDERR: {}".format(error_message, line), err=stderr)
+    for name, output in (("STDOUT", error.stdout), ("STDERR", error.stderr)):
+        # Output may be empty, or None if it wasn't captured at all.
+        if not output:
+            continue
+        lines = output.decode("utf-8", "backslashreplace").splitlines()
+        click.echo("\n".join("{} {}: {}".format(error_message, name, line) for line in lines), err=stderr)
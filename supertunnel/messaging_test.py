@@ -40,8 +40,11 @@ def now(monkeypatch):
     return DateTime.now()
 
 
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
 def clean_message(msg: str) -> str:
-    return re.sub(r"\x1b\[[0-9;]*m", "", msg)
+    return _ANSI_RE.sub("", msg)
 
 
 def test_buildmessage(messenger, now, stream):
@@ -53,18 +56,47 @@ def test_buildmessage(messenger, now, stream):
     assert clean_message(sm._build_message()) == "[foo] 0:00:00 | hello"
 
 
+def test_buildmessage_unstyled_when_disabled(messenger, now, stream):
+    sm = messenger(stream)
+
+    sm.status("foo", fg="red")
+    sm.message("hello", bold=True)
+
+    assert sm._build_message() == "[foo] 0:00:00 | hello"
+
+
 class MockTerminfo:
 
     _commands: List[Tuple[str, ...]] = []
     _capabilities: Set[str] = set()
 
-    def send(self, *args: str) -> None:
+    def sequence(self, *args: str) -> bytes:
         self._commands.append(args)
+        return "".join(f"<{cap}>" for cap in args).encode("ascii")
 
     def has(self, *args: str) -> bool:
         return all(cap in self._capabilities for cap in args)
 
 
+def test_terminfo_without_tty(monkeypatch):
+    monkeypatch.setattr(messaging.sys.stdout, "isatty", lambda: False)
+    ti = messaging._Terminfo()
+    assert not ti.has("cr", "el")
+    with pytest.raises(ValueError):
+        ti.sequence("cr", "el")
+
+
+def test_terminfo_is_lazy(monkeypatch):
+    created = []
+    monkeypatch.setattr(messaging, "_Terminfo", lambda: created.append(True) or MockTerminfo())
+
+    ti = messaging._LazyTerminfo()
+    assert not created
+    ti.has("cr")
+    ti.has("el")
+    assert created == [True]
+
+
 @pytest.fixture
 def terminfo(monkeypatch):
     ti = MockTerminfo()
@@ -72,16 +104,92 @@ def terminfo(monkeypatch):
     return ti
 
 
-def test_statusmessage(monkeypatch, terminfo, now, stream):
+@pytest.fixture
+def ticks(monkeypatch):
+    ticks = [0.0]
+
+    def mock_monotonic() -> float:
+        return ticks[-1]
+
+    monkeypatch.setattr(messaging.time, "monotonic", mock_monotonic)
+    return ticks
+
+
+def test_statusmessage(monkeypatch, terminfo, now, stream, ticks):
     monkeypatch.setattr(messaging.StatusMessage, "_enabled", None)
     terminfo._capabilities.update(("cr", "el", "rmam", "smam"))
     sm = messaging.StatusMessage(stream)
     with sm:
         sm.status("hello")
+        ticks.append(20.0)
         sm.message("foo")
 
     sv = clean_message(stream.getvalue())
-    assert sv == "[] 0:00:00 | [hello] 0:00:00 | [hello] 0:00:00 | foo"
+    assert sv == (
+        "<cr><el><rmam>[] 0:00:00 | <smam>"
+        "<cr><el><rmam>[hello] 0:00:00 | <smam>"
+        "<cr><el><rmam>[hello] 0:00:00 | foo<smam>"
+        "<el>"
+    )
+
+
+def test_statusmessage_throttle(monkeypatch, terminfo, now, stream, ticks):
+    monkeypatch.setattr(messaging.StatusMessage, "_enabled", None)
+    terminfo._capabilities.update(("cr", "el", "rmam", "smam"))
+    sm = messaging.StatusMessage(stream)
+    with sm:
+        sm.message("first")
+        sm.status("hello")
+        sm.message("second")
+        ticks.append(0.5)
+        sm.message("third")
+
+    # Messages wait for the next refresh, status changes are drawn immediately.
+    sv = clean_message(stream.getvalue())
+    assert sv == (
+        "<cr><el><rmam>[] 0:00:00 | <smam>"
+        "<cr><el><rmam>[hello] 0:00:00 | first<smam>"
+        "<cr><el><rmam>[hello] 0:00:00 | third<smam>"
+        "<el>"
+    )
+
+
+def test_statusmessage_end_of_burst(monkeypatch, terminfo, now, stream, ticks):
+    monkeypatch.setattr(messaging.StatusMessage, "_enabled", None)
+    terminfo._capabilities.update(("cr", "el", "rmam", "smam"))
+    sm = messaging.StatusMessage(stream)
+    with sm:
+        ticks.append(1.0)
+        sm.message("first")
+        sm.message("last")
+        # The first quiet spell draws the held back line, the next one clears it.
+        ticks.append(1.05)
+        sm.idle()
+        ticks.append(1.5)
+        sm.idle()
+
+    sv = clean_message(stream.getvalue())
+    assert sv == (
+        "<cr><el><rmam>[] 0:00:00 | <smam>"
+        "<cr><el><rmam>[] 0:00:00 | first<smam>"
+        "<cr><el><rmam>[] 0:00:00 | last<smam>"
+        "<cr><el><rmam>[] 0:00:00 | <smam>"
+        "<el>"
+    )
+
+
+def test_statusmessage_repeated_status(monkeypatch, terminfo, now, stream, ticks):
+    monkeypatch.setattr(messaging.StatusMessage, "_enabled", None)
+    terminfo._capabilities.update(("cr", "el", "rmam", "smam"))
+    sm = messaging.StatusMessage(stream)
+    with sm:
+        sm.status("disconnected")
+        change = sm._change
+        sm.status("disconnected")
+        assert sm._change is change
+
+    sv = clean_message(stream.getvalue())
+    assert sv.count("[disconnected]") == 1
 
 
 @pytest.fixture
@@ -107,3 +215,22 @@ def test_print_subprocess_error(echo):
     )
     assert clean_message(echo[1][0]) == "[ERROR] STDOUT: Hello"
     assert clean_message(echo[2][0]) == "[ERROR] STDERR: stderr"
+
+
+def test_print_subprocess_error_without_output(echo):
+
+    error = subprocess.CalledProcessError(returncode=255, cmd=["ssh"], output=b"", stderr=None)
+
+    messaging.echo_subprocess_error(error, "Test problem:")
+
+    assert len(echo) == 1
+
+
+def test_print_subprocess_error_multiline(echo):
+
+    error = subprocess.CalledProcessError(returncode=1, cmd=["ssh"], output=b"", stderr=b"one\ntwo\n")
+
+    messaging.echo_subprocess_error(error, "Test problem:")
+
+    assert len(echo) == 2
+    assert clean_message(echo[1][0]) == "[ERROR] STDERR: one\n[ERROR] STDERR: two"
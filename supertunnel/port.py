@@ -1,7 +1,9 @@
+import functools
 from dataclasses import dataclass
 from typing import Dict
 from typing import Iterable
 from typing import Optional
+from typing import Type
 from typing import Union
 
 import click
@@ -14,21 +16,40 @@ class ForwardingPort:
     sourcehost: Optional[str] = None
     destinationhost: str = "localhost"
 
+    def __post_init__(self) -> None:
+        # Fields are frozen, so the formatted endpoints can be built once. They are kept in
+        # the instance dict rather than declared, so fields()/asdict()/astuple() don't see them.
+        if self.sourcehost:
+            source = f"{self.sourcehost}:{self.sourceport:d}"
+        else:
+            source = f"{self.sourceport:d}"
+        destination = f"{self.destinationhost}:{self.destinationport:d}"
+        cache = self.__dict__
+        cache["_source"] = source
+        cache["_destination"] = destination
+        cache["_str"] = f"{source}:{destination}"
+        cache["_hash"] = hash((self.sourceport, self.destinationport, self.sourcehost, self.destinationhost))
+
+    def __reduce__(self):
+        # Rebuild from the fields, since the cached hash is only valid in this process.
+        return (self.__class__, (self.sourceport, self.destinationport, self.sourcehost, self.destinationhost))
+
     @property
     def source(self) -> str:
-        if self.sourcehost:
-            return f"{self.sourcehost}:{self.sourceport:d}"
-        return f"{self.sourceport:d}"
+        return self.__dict__["_source"]
 
     @property
     def destination(self) -> str:
-        return f"{self.destinationhost}:{self.destinationport:d}"
+        return self.__dict__["_destination"]
 
     def __repr__(self) -> str:
         return f"ForwardingPort(soruce={self.source}, destination={self.destination})"
 
     def __str__(self) -> str:
-        return f"{self.source}:{self.destination}"
+        return self.__dict__["_str"]
+
+    def __hash__(self) -> int:
+        return self.__dict__["_hash"]
 
     @classmethod
     def parse(cls, value: Union[str, int, tuple]) -> "ForwardingPort":
@@ -39,32 +60,37 @@ class ForwardingPort:
             return cls(src, dst)
         elif isinstance(value, cls):
             return value
-
-        # Ensure that we can properly split pair values
-        if "," in value:
-            s, d = value.split(",", 1)
-            return cls(int(s.strip()), int(d.strip()))
-
-        if ":" in value:
-            parts = value.split(":", 3)
-            if len(parts) == 4:
-                return cls(
-                    sourcehost=parts[0],
-                    sourceport=int(parts[1]),
-                    destinationhost=parts[2],
-                    destinationport=int(parts[3]),
-                )
-            elif len(parts) == 3:
-                return cls(sourceport=int(parts[0]), destinationhost=parts[1], destinationport=int(parts[2]))
-            elif len(parts) == 2:
-                return cls(sourceport=int(parts[0]), destinationport=int(parts[1]))
-            else:  # pragma: no cover
-                # This should be unreachable.
-                raise ValueError(value)
-
-        # Fallback to assuming we only got one value.
-        s_port = d_port = int(value.strip())
-        return cls(s_port, d_port)
+        return _parse_str(cls, value)  # type: ignore
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_str(cls: Type[ForwardingPort], value: str) -> ForwardingPort:
+    """Parse the string forms of a port, cached (per class) since ports are immutable"""
+    # Ensure that we can properly split pair values
+    if "," in value:
+        s, d = value.split(",", 1)
+        return cls(int(s.strip()), int(d.strip()))
+
+    if ":" in value:
+        parts = value.split(":", 3)
+        if len(parts) == 4:
+            return cls(
+                sourcehost=parts[0],
+                sourceport=int(parts[1]),
+                destinationhost=parts[2],
+                destinationport=int(parts[3]),
+            )
+        elif len(parts) == 3:
+            return cls(sourceport=int(parts[0]), destinationhost=parts[1], destinationport=int(parts[2]))
+        elif len(parts) == 2:
+            return cls(sourceport=int(parts[0]), destinationport=int(parts[1]))
+        else:  # pragma: no cover
+            # This should be unreachable.
+            raise ValueError(value)
+
+    # Fallback to assuming we only got one value.
+    s_port = d_port = int(value.strip())
+    return cls(s_port, d_port)
 
 
 class ForwardingPortArgument(click.ParamType):
@@ -82,12 +108,15 @@ class ForwardingPortArgument(click.ParamType):
     ) -> Optional[ForwardingPort]:
         """Called to create this type when parsing on the command line"""
 
+        # Defaults and re-conversions are often already ports.
+        if isinstance(value, ForwardingPort):
+            return value
+
         # Skip parsing when the parameter isn't really present (e.g.
         # when click is responding to a completion request)
         if not value or getattr(ctx, "resilient_parsing", False):
             return None
 
-        # Ensure that we pass through values which are already correct.
         try:
             port = ForwardingPort.parse(value)
         except ValueError:
@@ -1,3 +1,5 @@
+import dataclasses
+import pickle
 from typing import Any
 from typing import Callable
 from typing import Dict
@@ -81,6 +83,11 @@ def test_argtype_convert(value, expected):
     assert parsed == expected.apply(ForwardingPort)
 
 
+def test_argtype_convert_passthrough():
+    port = ForwardingPort(10, 20)
+    assert ForwardingPortArgument().convert(port, param=None, ctx=None) is port
+
+
 class MockContext:
     resilient_parsing: bool = True
 
@@ -92,3 +99,26 @@ def test_argtype_failure(value):
         arg.convert(value, param=None, ctx=None)
 
     arg.convert(value, param=None, ctx=MockContext())
+
+
+def test_port_dataclass_fields():
+    port = ForwardingPort(10, 20, sourcehost="0.0.0.0")
+    names = [f.name for f in dataclasses.fields(port)]
+    assert names == ["sourceport", "destinationport", "sourcehost", "destinationhost"]
+    assert dataclasses.astuple(port) == (10, 20, "0.0.0.0", "localhost")
+
+
+def test_port_pickle():
+    port = ForwardingPort(10, 20, sourcehost="0.0.0.0")
+    copied = pickle.loads(pickle.dumps(port))
+    assert copied == port
+    assert str(copied) == str(port)
+    assert hash(copied) == hash(port)
+
+
+def test_port_parse_subclass():
+    class LocalPort(ForwardingPort):
+        pass
+
+    assert type(LocalPort.parse("8888")) is LocalPort
+    assert type(ForwardingPort.parse("8888")) is ForwardingPort
@@ -1,4 +1,6 @@
 import logging
+import re
+from itertools import chain
 from typing import Any
 from typing import Dict
 from typing import IO
@@ -18,12 +20,16 @@ __all__ = ["SSHConfiguration"]
 
 log = logging.getLogger(__name__)
 
+_HOST_ARGS_DROPPED = frozenset(("ssh", "--"))
+
 
 class SSHConfiguration(SSHConfigBase):
     """
     Configuration for arguments to the ssh command.
     """
 
+    __slots__ = ("host", "args")
+
     no_remote_command = SSHFlag("-N")
     verbose = SSHFlag("-v")
 
@@ -33,6 +39,10 @@ class SSHConfiguration(SSHConfigBase):
     batch_mode = SSHOption("BatchMode", bool)
     exit_on_forward_failure = SSHOption("ExitOnForwardFailure", bool)
 
+    control_master = SSHOption("ControlMaster", str)
+    control_path = SSHOption("ControlPath", str)
+    control_persist = SSHOption("ControlPersist", str)
+
     forward_local = SSHPortForwarding(mode="local")
     forward_remote = SSHPortForwarding(mode="remote")
 
@@ -48,35 +58,31 @@ class SSHConfiguration(SSHConfigBase):
     ):
         super().__init__()
         if options:
-            self._ssh_options.update(options)
+            self._ssh_options.update((key.lower(), value) for key, value in options.items())
         self.host = host or []
         self.args = args or []
 
     def __repr__(self):
-        options = self._ssh_options._values
+        options = dict(self._ssh_options)
         args = " ".join(self.args)
         host = " ".join(self.host)
         return f"{self.__class__.__name__}({options!r}, {args!r}, {host!r})"
 
     def copy(self) -> "SSHConfiguration":
-        cfg = self.__class__(options=self._ssh_options._values, host=self.host, args=self.args)
+        # Multi-valued options are lists, which must not be shared with the copy.
+        options = {key: list(value) if isinstance(value, list) else value for key, value in self._ssh_options.items()}
+        cfg = self.__class__(options=options, host=list(self.host), args=list(self.args))
         return cfg
 
     def set_host(self, args: Union[str, Iterable[str]]) -> None:
         if isinstance(args, str):
-            host_args = [args]
-        elif args:
-            host_args = list(args)
-        else:
-            host_args = []
+            args = [args]
+        elif not args:
+            args = []
 
         # Remove "ssh" and "--" from arguments, since they probably came from CLI parsing?
-        while "ssh" in host_args:
-            host_args.remove("ssh")
-        while "--" in host_args:
-            host_args.remove("--")
-
-        self.host = host_args
+        # Filtering builds a fresh list in one pass, so the caller's arguments aren't shared.
+        self.host = [arg for arg in args if arg not in _HOST_ARGS_DROPPED]
 
     def extend(self, values: Iterable[str]) -> None:
         self.args.extend(values)
@@ -85,15 +91,14 @@ class SSHConfiguration(SSHConfigBase):
         """
         Construct the list of arguments to pass to ssh
         """
-        args = ["ssh"]
-        for option in self._ssh_options.options(self):
-            args.extend(option.arguments(self))
+        options = chain.from_iterable(option.arguments(self) for option in self._ssh_descriptors)
 
         # Host goes last to override previous options if necessary
-        args.extend(self.host)
-        if include_cmd_args:
-            args.extend(self.args)
-        return args
+        return list(chain(["ssh"], options, self.host, self.args if include_cmd_args else ()))
+
+
+# keyword, then whitespace or a single '=', then a quoted or bare argument.
+_CONFIG_LINE_RE = re.compile(r'^\s*([^\s=#]+)(\s*=\s*|\s+)(?:"([^"]*)"|(\S.*?))?\s*$')
 
 
 class ConfigValue(NamedTuple):
@@ -101,13 +106,6 @@ class ConfigValue(NamedTuple):
     argument: str
 
 
-def parse_quoted_string(value: str) -> str:
-    value = value.strip()
-    if value.startswith('"') and value.endswith('"'):
-        return value[1:-1]
-    return value
-
-
 def parse_ssh_config_line(line: str) -> Optional[ConfigValue]:
 
     # The file contains keyword-argument pairs, one per line.  Lines starting
@@ -118,18 +116,20 @@ def parse_ssh_config_line(line: str) -> Optional[ConfigValue]:
     # is useful to avoid the need to quote whitespace when specifying configu-
     # ration options using the ssh, scp, and sftp -o option.
 
-    if line.lstrip().startswith("#"):
+    # Comments and blank lines don't match.
+    match = _CONFIG_LINE_RE.match(line)
+    if match is None:
         return None
 
-    if not line.strip():
-        return None
-
-    if "=" in line:
-        keyword, argument = line.split("=", 1)
-        return ConfigValue(keyword.strip().lower(), parse_quoted_string(argument))
-
-    keyword, argument = line.split(None, 1)
-    return ConfigValue(keyword.strip().lower(), parse_quoted_string(argument))
+    keyword, separator, quoted, argument = match.groups()
+    if quoted is not None:
+        return ConfigValue(keyword.lower(), quoted)
+    if argument is None:
+        # 'Keyword =' sets an empty argument, but a bare keyword isn't an option at all.
+        if "=" not in separator:
+            return None
+        argument = ""
+    return ConfigValue(keyword.lower(), argument)
 
 
 def parse_config_file(file: IO[str]) -> Iterable[ConfigValue]:
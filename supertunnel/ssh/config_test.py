@@ -4,6 +4,8 @@ from ..port import ForwardingPort
 from .config import ConfigValue
 from .config import parse_ssh_config_line
 from .config import SSHConfiguration
+from .helpers import SSHOption
+from .helpers import SSHTypeError
 
 
 def test_configuration():
@@ -51,6 +53,47 @@ def test_portfowarding():
     assert "10:localhost:30" in cfg.arguments()
 
 
+def test_portforwarding_duplicates():
+
+    cfg = SSHConfiguration()
+    cfg.forward_local = [ForwardingPort(10, 20), ForwardingPort(30, 40), ForwardingPort(10, 20)]
+    assert cfg.arguments() == ["ssh", "-L", "10:localhost:20", "-L", "30:localhost:40"]
+
+
+def test_option_unsupported_type():
+    with pytest.raises(SSHTypeError):
+        SSHOption("Compression", float)
+
+
+def test_subclass_options():
+    class CompressedConfiguration(SSHConfiguration):
+        compression = SSHOption("Compression", bool)
+
+    cfg = CompressedConfiguration()
+    cfg.verbose = True
+    cfg.compression = True
+    assert cfg.arguments() == ["ssh", "-v", "-o", "Compression yes"]
+
+    assert CompressedConfiguration.compression not in SSHConfiguration._ssh_descriptors
+
+
+def test_options_case_insensitive():
+    cfg = SSHConfiguration(options={"ConnectTimeout": 5})
+    assert cfg.timeout == 5
+    assert cfg.copy().arguments() == ["ssh", "-o", "ConnectTimeout 5"]
+
+
+def test_copy_does_not_share_lists():
+    cfg = SSHConfiguration(host=["example.com"])
+    other = cfg.copy()
+    other.forward_local.append(ForwardingPort(1, 2))
+    other.forward_remote.append(ForwardingPort(3, 4))
+    other.host.append("extra")
+
+    assert cfg.arguments() == ["ssh", "example.com"]
+    assert other.arguments() == ["ssh", "-L", "1:localhost:2", "-R", "3:localhost:4", "example.com", "extra"]
+
+
 def test_repr():
     cfg = SSHConfiguration()
 
@@ -87,12 +130,16 @@ def test_cfg_extend():
         (" HOST foo.example.com", ("host", "foo.example.com")),
         ("Batchmode = no", ("batchmode", "no")),
         ('QuotedKey = "Confrabulator "', ("quotedkey", "Confrabulator ")),
+        ("ProxyCommand ssh -o ForwardAgent=no jump", ("proxycommand", "ssh -o ForwardAgent=no jump")),
+        ("Port=22\n", ("port", "22")),
+        ("IdentityFile =", ("identityfile", "")),
+        ("IdentityFile= \n", ("identityfile", "")),
     ],
 )
 def test_configparsing(value, expected):
     assert parse_ssh_config_line(value) == ConfigValue(*expected)
 
 
-@pytest.mark.parametrize("value", ["", "# foo bar", "   # baz comment", "   "])
+@pytest.mark.parametrize("value", ["", "# foo bar", "   # baz comment", "   ", "Host", "Host  \n"])
 def test_configparsing_comments(value):
     assert parse_ssh_config_line(value) is None
@@ -4,11 +4,15 @@ import logging
 import selectors
 import subprocess
 import time
+from typing import Dict
 from typing import IO
+from typing import Optional
+from typing import Union
 
 import click
 
-from ..log import PIDFilter
+from ..log import flush_buffered
+from ..log import rollover
 from ..messaging import StatusMessage
 from .config import SSHConfiguration
 
@@ -16,6 +20,9 @@ __all__ = ["ContinuousSSH"]
 
 log = logging.getLogger(__name__)
 
+_DEBUG_PREFIX = "debug1:"
+_DEBUG_PREFIX_LEN = len(_DEBUG_PREFIX)
+
 
 class Action(enum.Enum):
     CONTINUE = enum.auto()
@@ -56,11 +63,20 @@ class ContinuousSSH:
         self.logger = logging.getLogger(__name__)
         self._sshhandler = self.sshlog.handlers[0]
 
+        # Records from each run are tagged with the process PID. The adapters are reused,
+        # since a child logger per PID would be kept by the logging module forever.
+        self._log_extra: Dict[str, Optional[int]] = {"pid": None}
+        self._proc_sshlog = logging.LoggerAdapter(self.sshlog, self._log_extra)
+        self._proc_log = logging.LoggerAdapter(self.logger, self._log_extra)
+
         self._popen_settings = {"bufsize": 0}
         self._max_backoff_time = 2.0
         self._backoff_time = 0.1
 
         self._subproc_stdout_timeout = 0.1
+        # Idle waits back off to this, which still ticks the status clock each second.
+        self._subproc_stdout_max_timeout = 1.0
+        self._subproc_read_size = 65536
 
     def __repr__(self):
         return f"ContinuousSSH({self.config!r})"
@@ -98,83 +114,105 @@ class ContinuousSSH:
 
     def timeout(self):
         """Handle timeout"""
-        self._messenger.message("")
+        self._messenger.idle()
+        # ssh is quiet, so this is a cheap moment to get buffered logs onto disk.
+        flush_buffered()
 
     def _await_output(self, proc, timeout=None):
         """Await output from the stream"""
+        # stdout is unbuffered, so readline() would cost a read per byte. Instead,
+        # take everything available on each wake and hold on to any partial line.
+        pending = b""
+        wait = timeout
         sel = selectors.DefaultSelector()
         with contextlib.closing(sel):
             sel.register(proc.stdout, selectors.EVENT_READ)
             while proc.returncode is None:
-                events = sel.select(timeout=timeout)
+                events = sel.select(timeout=wait)
+                if events:
+                    wait = timeout
+                else:
+                    self.timeout()
+                    if wait is not None:
+                        # Nothing is happening: wake up less often until ssh speaks again.
+                        wait = min(2.0 * wait, max(timeout, self._subproc_stdout_max_timeout))
                 for (key, event) in events:
                     if key.fileobj is proc.stdout:
-                        line = proc.stdout.readline()
-                        if line:
-                            yield line.decode("utf-8", "backslashreplace").strip("\r\n").strip()
-                if not events:
-                    self.timeout()
+                        chunk = proc.stdout.read(self._subproc_read_size)
+                        if chunk:
+                            complete, newline, pending = (pending + chunk).rpartition(b"\n")
+                        else:
+                            complete, newline, pending = pending, b"", b""
+                        if not (complete or newline):
+                            continue
+                        # Decode every complete line at once: the split is at a newline,
+                        # so no multi-byte character is cut in half.
+                        for line in complete.decode("utf-8", "backslashreplace").split("\n"):
+                            yield line.strip()
                 proc.poll()
 
-    def _handle_ssh_line(self, line: str, sshlog: logging.Logger) -> Action:
-        if line.startswith("debug1:"):
-            line = line[len("debug1:") :].strip()
+    def _handle_ssh_line(self, line: str, sshlog: Union[logging.Logger, logging.LoggerAdapter]) -> Action:
+        if line.startswith(_DEBUG_PREFIX):
+            line = line[_DEBUG_PREFIX_LEN:].lstrip()
             sshlog.debug(line)
         else:
             sshlog.info(line)
 
-        action = Action.CONTINUE
         self._messenger.message(line)
 
-        if "Entering interactive session" in line:
-            action = Action.CONNECTED
-
+        # A dead connection wins over anything else on the same line.
         if "not responding" in line:
-            action = Action.DISCONNECTED
-
-        self._messenger.message(line)
-        return action
+            return Action.DISCONNECTED
+        if "Entering interactive session" in line:
+            return Action.CONNECTED
+        return Action.CONTINUE
 
     def _run_once(self):
         """Run the SSH process once"""
-        proc = subprocess.Popen(
-            self.config.arguments(), stderr=subprocess.STDOUT, stdout=subprocess.PIPE, **self._popen_settings
-        )
+        args = self.config.arguments()
+        proc = subprocess.Popen(args, stderr=subprocess.STDOUT, stdout=subprocess.PIPE, **self._popen_settings)
 
-        pid_filter = PIDFilter(proc.pid)
-        sshlog = self.sshlog.getChild(str(proc.pid))
-        sshlog.addFilter(pid_filter)
-        log = self.logger.getChild(str(proc.pid))
-        log.addFilter(pid_filter)
+        self._log_extra["pid"] = proc.pid
+        sshlog = self._proc_sshlog
+        log = self._proc_log
 
-        log.info("Launching PID{}".format(proc.pid))
-        log.debug("Config = %r", self.config)
-        log.debug("Command = %s", " ".join(self.config.arguments()))
+        log.info("Launching PID%d", proc.pid)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Config = %r", self.config)
+            log.debug("Command = %s", " ".join(args))
 
         try:
-            log.debug("Connecting PID{}".format(proc.pid))
+            log.debug("Connecting PID%d", proc.pid)
             self._messenger.status("connecting", fg="yellow")
 
+            # Bound once, since this loop runs for every line ssh prints.
+            handle_line = self._handle_ssh_line
+            status = self._messenger.status
+
             # We drink from the SSH log firehose, so that we can
             # identify when connections are dying and kill them.
             for line in self._await_output(proc, timeout=self._subproc_stdout_timeout):
 
-                action = self._handle_ssh_line(line, sshlog)
+                action = handle_line(line, sshlog)
+
+                # Almost every line is just ssh chatter.
+                if action is Action.CONTINUE:
+                    continue
 
-                if action == Action.DISCONNECTED:
-                    self._messenger.status("disconnected", fg="red")
-                    log.debug("Killing PID{}".format(proc.pid))
+                if action is Action.DISCONNECTED:
+                    status("disconnected", fg="red")
+                    log.debug("Killing PID%d", proc.pid)
                     proc.kill()
-                if action == Action.CONNECTED:
-                    self._messenger.status("connected", fg="green")
-                    log.debug("Connected PID{}".format(proc.pid))
+                elif action is Action.CONNECTED:
+                    status("connected", fg="green")
+                    log.debug("Connected PID%d", proc.pid)
 
-            log.info("Waiting for process PID{} to end".format(proc.pid))
+            log.info("Waiting for process PID%d to end", proc.pid)
             proc.wait()
             self._messenger.status("disconnected", fg="red")
-            self._sshhandler.doRollover()
+            rollover(self._sshhandler)
         finally:
             if proc.returncode is None:
                 proc.terminate()
             self._messenger.status("disconnected", fg="red")
-            log.debug("Process PID{} Ended".format(proc.pid))
+            log.debug("Process PID%d Ended", proc.pid)
@@ -140,6 +140,7 @@ class MockPopen:
 class MockSelector:
 
     events: List[int] = []
+    timeouts: List[Any] = []
 
     def __init__(self):
         self.keys = []
@@ -151,15 +152,19 @@ class MockSelector:
         self.keys.append(selectors.SelectorKey(fileobj=fileobj, fd=0, events=[event], data=None))
 
     def select(self, *, timeout=None):
+        self.timeouts.append(timeout)
         if not self.events:
             return []
         event = self.events.pop()
+        if not event:
+            return []
         return [(key, event) for (key, event) in itertools.product(self.keys, [event])]
 
 
 @pytest.fixture
 def selector(monkeypatch):
     monkeypatch.setattr(selectors, "DefaultSelector", MockSelector)
+    monkeypatch.setattr(MockSelector, "timeouts", [])
     return MockSelector
 
 
@@ -212,3 +217,43 @@ def test_run(monkeypatch, proc):
 
     proc.run()
     assert list(get_transitions(proc)) == ["disconnected"]
+
+
+def test_await_output_partial_lines(selector: Type[MockSelector], proc: ContinuousSSH, popen: Type[MockPopen]) -> None:
+    # Four reads of 8 bytes, then end-of-file.
+    selector.events = [selectors.EVENT_READ] * 5
+    mock_proc = popen(["ssh"])
+    mock_proc._raise = False
+    proc._subproc_read_size = 8
+
+    mock_proc.stdout = io.BytesIO(b"debug1: first\r\nsecond\nlast")
+    lines = list(proc._await_output(mock_proc))
+    assert lines == ["debug1: first", "second", "last"]
+
+
+def test_await_output_split_character(
+    selector: Type[MockSelector], proc: ContinuousSSH, popen: Type[MockPopen]
+) -> None:
+    selector.events = [selectors.EVENT_READ] * 4
+    mock_proc = popen(["ssh"])
+    mock_proc._raise = False
+    proc._subproc_read_size = 4
+
+    # The two bytes of "é" land in different reads.
+    mock_proc.stdout = io.BytesIO("café\n\nok\n".encode("utf-8"))
+    lines = list(proc._await_output(mock_proc))
+    assert lines == ["café", "", "ok"]
+
+
+def test_await_output_idle_backoff(selector: Type[MockSelector], proc: ContinuousSSH, popen: Type[MockPopen]) -> None:
+    # Events pop from the end: idle three times, one line, then idle until the process exits.
+    selector.events = [selectors.EVENT_READ, 0, 0, 0]
+    mock_proc = popen(["ssh"])
+    mock_proc._raise = False
+    mock_proc._polls = 6
+    proc._subproc_stdout_max_timeout = 0.4
+
+    mock_proc.stdout = io.BytesIO(b"hello\n")
+    lines = list(proc._await_output(mock_proc, timeout=0.1))
+    assert lines == ["hello"]
+    assert selector.timeouts == pytest.approx([0.1, 0.2, 0.4, 0.4, 0.1, 0.2])
@@ -1,16 +1,15 @@
-from collections.abc import Mapping
+import abc
 from typing import Any
-from typing import Dict
+from typing import Callable
 from typing import Generic
 from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import overload
-from typing import Set
+from typing import Sequence
 from typing import Type
 from typing import TypeVar
 from typing import Union
-from weakref import WeakKeyDictionary
 
 import click
 
@@ -30,31 +29,54 @@ class SSHTypeError(Exception):
 
 
 class SSHConfigBase:
+    __slots__ = ("_ssh_options",)
+
+    #: Descriptors in definition order, kept on each class which declares any.
+    _ssh_descriptors: List["SSHDescriptorBase"] = []
+
     def __init__(self):
-        self._ssh_options = SSHOptions()
+        # Keyed by the lower-cased option name, which descriptors keep pre-lowered.
+        self._ssh_options = {}
+        # Lists for multi-valued options are created up front, so reads don't have to.
+        for descriptor in self._ssh_descriptors:
+            if isinstance(descriptor, SSHMultiDescriptor):
+                self._ssh_options[descriptor._key] = descriptor.initial()
 
 
 T = TypeVar("T")
 S = SSHConfigBase
 
 
-class SSHDescriptorBase(Generic[T]):
+class SSHDescriptorBase(Generic[T], metaclass=abc.ABCMeta):
+    __slots__ = ("name", "type", "default", "_key")
+
     def __init__(self, name: Optional[str] = None, type: Any = str, default: Optional[T] = None) -> None:
         super().__init__()
         self.name = name
         self.type = type
         self.default = default
+        # Option keys are case-insensitive, so keep the lowered key at hand.
+        self._key = name.lower() if name else None
 
     def __set_name__(self, owner: Type[S], name: str) -> None:
         if self.name is None:
             self.name = name
-        SSHOptions.add(owner, self)
+        self._key = self.name.lower()
+        if "_ssh_descriptors" not in owner.__dict__:
+            # Start from any inherited descriptors, without changing the parent's list.
+            owner._ssh_descriptors = list(owner._ssh_descriptors)
+        if self not in owner._ssh_descriptors:
+            owner._ssh_descriptors.append(self)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.name}, type={self.type})"
 
     def value(self, obj: S) -> Optional[T]:
-        return obj._ssh_options.get(self.name, self.default)
+        return obj._ssh_options.get(self._key, self.default)
+
+    @abc.abstractmethod
+    def arguments(self, owner: Any) -> Sequence[str]:
+        """The ssh command line arguments for this option's value on owner"""
 
     @overload
     def __get__(self, obj: S, owner: Type[S]) -> Optional[T]:
@@ -71,9 +93,9 @@ class SSHDescriptorBase(Generic[T]):
 
     def __set__(self, obj: S, value: Union[T, str]) -> None:
         if value is None:
-            obj._ssh_options[self.name] = value
+            obj._ssh_options[self._key] = value
         else:
-            obj._ssh_options[self.name] = self.type(value)
+            obj._ssh_options[self._key] = self.type(value)
 
     def option(self, *args, **kwargs):
         kwargs["callback"] = self.callback
@@ -95,6 +117,8 @@ class SSHDescriptorBase(Generic[T]):
 
 
 class SSHMultiDescriptor(SSHDescriptorBase):
+    __slots__ = ()
+
     @overload
     def __get__(self, obj: S, owner: Type[S]) -> List[T]:
         pass
@@ -109,12 +133,15 @@ class SSHMultiDescriptor(SSHDescriptorBase):
         return self.values(obj)
 
     def __set__(self, obj: S, value: Union[T, str]) -> None:
-        obj._ssh_options[self.name] = value
+        obj._ssh_options[self._key] = value
+
+    def initial(self) -> List[T]:
+        return [self.default] if self.default is not None else []
 
     def values(self, obj: S) -> List[T]:
-        values = obj._ssh_options.setdefault(self.name, [])
-        if not values and self.default is not None:
-            values.append(self.default)
+        values = obj._ssh_options.get(self._key)
+        if values is None:
+            values = obj._ssh_options[self._key] = self.initial()
         return values
 
     def callback(self, ctx: click.Context, param: str, values: Optional[Iterable[str]]) -> None:
@@ -136,7 +163,30 @@ class SSHMultiDescriptor(SSHDescriptorBase):
         return super().option(*args, **kwargs)
 
 
+def _format_bool(value: Any) -> str:
+    return "yes" if value else "no"
+
+
+def _option_formatter(type: Any) -> Callable[[Any], str]:
+    """Choose how values of this type are written in an ssh -o option"""
+    if issubclass(type, bool):
+        return _format_bool
+    elif issubclass(type, int):
+        return "{0:d}".format
+    elif issubclass(type, str):
+        # Helps ensure we actually have a string.
+        return "{:s}".format
+    raise SSHTypeError(type)
+
+
 class SSHOption(SSHDescriptorBase):
+    __slots__ = ("_format",)
+
+    def __init__(self, name: Optional[str] = None, type: Any = str, default: Optional[T] = None) -> None:
+        super().__init__(name=name, type=type, default=default)
+        # Resolved once here, rather than every time arguments are built.
+        self._format = _option_formatter(type)
+
     def arguments(self, owner: Any) -> List[str]:
         value = self.value(owner)
 
@@ -145,45 +195,39 @@ class SSHOption(SSHDescriptorBase):
         if value is None:
             return []
 
-        ssh_args = ["-o"]
-
-        if issubclass(self.type, bool):
-            value = "yes" if value else "no"
-        elif issubclass(self.type, int):
-            value = "{0:d}".format(value)
-        elif issubclass(self.type, str):
-            # Helps ensure we actually have a string.
-            value = "{:s}".format(value)
-        else:
-            raise SSHTypeError(self.type, value)
-
-        ssh_args.append(f"{self.name} {value}")
-        return ssh_args
+        return ["-o", f"{self.name} {self._format(value)}"]
 
 
 class SSHFlag(SSHDescriptorBase):
+    __slots__ = ("flag", "_on")
+
     def __init__(self, flag: str, default: Optional[bool] = None) -> None:
         super().__init__(name=None, type=bool, default=default)
         self.flag = flag
+        # The flag never changes, so every call can hand back the same tuple.
+        self._on = (flag,)
 
-    def arguments(self, owner: Any) -> List[str]:
+    def arguments(self, owner: Any) -> Sequence[str]:
         value = self.value(owner)
 
         if value is None:
-            return []
+            return ()
 
         if not isinstance(value, bool):
             raise SSHTypeError(self.type, value)
 
         if value:
-            return [self.flag]
-        return []
+            return self._on
+        return ()
 
 
 class SSHPortForwarding(SSHMultiDescriptor):
+    __slots__ = ("mode", "_forward_arg")
+
     def __init__(self, mode: str = "local", default: Optional[ForwardingPort] = None) -> None:
         super().__init__(name=None, type=ForwardingPort.parse, default=default)
         self.mode = mode
+        self._forward_arg = {"local": "-L", "remote": "-R"}[mode]
 
     def arguments(self, owner: Any) -> List[str]:
         values = self.value(owner)
@@ -191,65 +235,10 @@ class SSHPortForwarding(SSHMultiDescriptor):
         if not values:
             return []
 
-        args = []
-        forward_arg = {"local": "-L", "remote": "-R"}[self.mode]
-
-        seen: Set[ForwardingPort] = set()
-        for fport in values:
-            if not fport or fport in seen:
-                continue
-
-            args.extend([forward_arg, str(fport)])
-            seen.add(fport)
-
-        return args
+        # De-duplicate on the rendered form, which is what ssh actually sees.
+        rendered = dict.fromkeys(str(fport) for fport in values if fport)
+        return [arg for fport in rendered for arg in (self._forward_arg, fport)]
 
     def option(self, *args, **kwargs):
         kwargs.setdefault("type", ForwardingPortArgument())
         return super().option(*args, **kwargs)
-
-
-_sentinel = object()
-
-
-class SSHOptions(Mapping):
-    _options: Dict[Type, List[SSHDescriptorBase]] = WeakKeyDictionary()  # type: ignore
-    _values: Dict[str, Any]
-
-    def __init__(self, values: Optional[Dict[str, Any]] = None) -> None:
-        self._values = dict(values or {})
-
-    @classmethod
-    def add(cls, owner: Any, option: SSHDescriptorBase) -> None:
-        options = cls.options(owner)
-        if option not in options:
-            options.append(option)
-
-    def __getitem__(self, key: str) -> Any:
-        return self._values[key.lower()]
-
-    def __setitem__(self, key: str, value: Any) -> None:
-        self._values[key.lower()] = value
-
-    def __len__(self) -> int:
-        return len(self._values)
-
-    def __iter__(self) -> Iterable[str]:  # type: ignore
-        return iter(self._values)
-
-    def setdefault(self, key: str, default: Any) -> None:
-        return self._values.setdefault(key.lower(), default)
-
-    def get(self, key: str, default: Any = _sentinel) -> Optional[Any]:
-        if default is _sentinel:
-            return self._values[key.lower()]
-        return self._values.get(key.lower(), default)
-
-    def update(self, options: Dict[str, Any]) -> None:
-        return self._values.update(options)
-
-    @classmethod
-    def options(cls, owner: Any) -> List[SSHDescriptorBase]:
-        if not isinstance(owner, type):
-            owner = type(owner)
-        return cls._options.setdefault(owner, [])